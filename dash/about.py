@@ -1,6 +1,9 @@
 """À propos de DVF Paris - Page d'information du projet."""
 import streamlit as st
 
+from etl.connexions import stats_connexions
+from etl.elasticsearch_utils import cache_recherche, surveillance_es
+
 
 def render_about():
     """affiche la page a propos."""
@@ -21,3 +24,23 @@ def render_about():
         """,
         unsafe_allow_html=True
     )
+
+    with st.expander("Connexions (pools partagés)"):
+        stats = stats_connexions()
+        col_pg, col_es = st.columns(2)
+        with col_pg:
+            st.markdown("**PostgreSQL**")
+            if stats["postgres"]:
+                st.json(stats["postgres"])
+            else:
+                st.write("pool non initialisé")
+        with col_es:
+            st.markdown("**Elasticsearch**")
+            if stats["elasticsearch"]:
+                st.json(stats["elasticsearch"])
+            else:
+                st.write("client non initialisé")
+            st.markdown("**Cache de recherche**")
+            st.json(cache_recherche.stats())
+            st.markdown("**Santé du cluster**")
+            st.json(surveillance_es.etat())
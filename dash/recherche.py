@@ -2,15 +2,34 @@
 Page de recherche Elasticsearch avec interface visuelle optimale
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from etl.elasticsearch_utils import rechercher_transactions, elasticsearch_disponible
-from dash.layout import styliser_fig, SECONDARY_COLOR
+from etl.elasticsearch_utils import (
+    charger_recherche,
+    exporter_csv,
+    elasticsearch_disponible,
+    surveillance_es,
+)
+from dash.layout import afficher_donnees_absentes, styliser_fig, SECONDARY_COLOR
+
+
+def _afficher_indisponible():
+    st.error("Elasticsearch n'est pas disponible ou l'index est vide. " \
+    "Lancez d'abord le scraper.")
+    st.info(
+        "Commande: `python etl/scraper.py` " \
+        "ou attendez que le scraping se termine dans le conteneur."
+    )
+
 
+def render_recherche(charger_donnees):
+    """Interface de recherche Elasticsearch avec design moderne.
 
-def render_recherche(_df):
-    """Interface de recherche Elasticsearch avec design moderne."""
+    charger_donnees: lecture PostgreSQL de la page, executee pendant le _msearch.
+    """
 
     st.markdown(
 		"""
@@ -28,14 +47,6 @@ def render_recherche(_df):
 		unsafe_allow_html=True,
 	)
 
-    if not elasticsearch_disponible():
-        st.error("Elasticsearch n'est pas disponible ou l'index est vide. " \
-        "Lancez d'abord le scraper.")
-        st.info(
-            "Commande: `python etl/scraper.py` " \
-            "ou attendez que le scraping se termine dans le conteneur."
-        )
-        return
     col_search, col_budget = st.columns([3, 1])
 
     with col_search:
@@ -63,187 +74,241 @@ def render_recherche(_df):
 			type="primary",
 		)
 
-    if rechercher or query:
-        with st.spinner("Recherche en cours dans Elasticsearch..."):
-            filtres = {"prix_max": budget_max} if budget_max else None
-            resultats = rechercher_transactions(query or "", filtres=filtres, taille=100)
+    recherche_lancee = bool(rechercher or query)
+    filtres = {"prix_max": budget_max} if budget_max else None
+    with st.spinner("Recherche en cours dans Elasticsearch..."):
+        # disponibilite, hits, statistiques et suggestions en un seul aller-retour (_msearch),
+        # lance dans un thread pendant la lecture PostgreSQL (appels Streamlit dans ce thread-ci)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            futur = None
+            if recherche_lancee:
+                prefixe = query.split()[-1] if query.strip() else None
+                futur = pool.submit(
+					charger_recherche, query or "", filtres=filtres, taille=100, prefixe=prefixe
+				)
+            df = charger_donnees()
+            reponse = futur.result() if futur is not None else None
+
+    if df.empty:
+        afficher_donnees_absentes()
+        return
 
-        if not resultats:
+    if not recherche_lancee and not elasticsearch_disponible():
+        _afficher_indisponible()
+        return
+
+    if recherche_lancee:
+        suggestions = reponse["suggestions"] or {}
+        libelles = suggestions.get("type_local", []) + suggestions.get("nature_mutation", []) + [
+			f"{arr}ème" for arr in suggestions.get("arrondissement", [])
+		]
+        if libelles:
+            with col_search:
+                st.caption("Suggestions : " + " · ".join(libelles[:8]))
+        if not reponse["disponible"]:
+            _afficher_indisponible()
+            return
+        resultats = reponse["resultats"]
+        stats = reponse["statistiques"]
+        # chaque section se degrade seule si sa sous-requete a echoue (None)
+        if resultats is None and stats is None:
+            st.error("La recherche a échoué. Réessayez dans un instant.")
+            return
+        if resultats == []:
             st.warning("Aucun résultat trouvé. Essayez une autre recherche.")
             return
-        df_resultats = pd.DataFrame(resultats)
-        df_resultats["date_mutation"] = pd.to_datetime(
-			df_resultats["date_mutation"], errors="coerce"
-		)
+        total_txt = f"{reponse['total']:,}" if reponse["total"] is not None else "?"
+        df_resultats = pd.DataFrame(resultats or [])
+        if not df_resultats.empty:
+            df_resultats["date_mutation"] = pd.to_datetime(
+				df_resultats["date_mutation"], errors="coerce"
+			)
 
         st.markdown("---")
-        col1, col2, col3, col4 = st.columns(4)
-
-        with col1:
-            st.markdown(
-				f"""
-				<div style='background: linear-gradient(135deg, #0ea5e9 0%, #06b6d4 100%);
-							padding: 1.5rem; border-radius: 12px; text-align: center;
-							box-shadow: 0 4px 12px rgba(14, 165, 233, 0.4);'>
-					<div style='font-size: 2.5rem; font-weight: 700; color: white;'>{len(resultats)}</div>
-					<div style='color: #e0f2fe; font-size: 0.9rem; margin-top: 0.3rem;'>Résultats</div>
-				</div>
-				""",
-				unsafe_allow_html=True,
-			)
+        if stats is not None:
+            col1, col2, col3, col4 = st.columns(4)
+
+            with col1:
+                st.markdown(
+					f"""
+					<div style='background: linear-gradient(135deg, #0ea5e9 0%, #06b6d4 100%);
+								padding: 1.5rem; border-radius: 12px; text-align: center;
+								box-shadow: 0 4px 12px rgba(14, 165, 233, 0.4);'>
+						<div style='font-size: 2.5rem; font-weight: 700; color: white;'>{total_txt}</div>
+						<div style='color: #e0f2fe; font-size: 0.9rem; margin-top: 0.3rem;'>Résultats</div>
+					</div>
+					""",
+					unsafe_allow_html=True,
+				)
 
-        with col2:
-            prix_moyen = df_resultats["valeur_fonciere"].mean()
-            st.markdown(
-				f"""
-				<div style='background: linear-gradient(135deg, #2563eb 0%, #3b82f6 100%);
-							padding: 1.5rem; border-radius: 12px; text-align: center;
-							box-shadow: 0 4px 12px rgba(37, 99, 235, 0.4);'>
-					<div style='font-size: 2.5rem; font-weight: 700; color: white;'>{prix_moyen/1e6:.2f}M€</div>
-					<div style='color: #dbeafe; font-size: 0.9rem; margin-top: 0.3rem;'>Prix moyen</div>
-				</div>
-				""",
-				unsafe_allow_html=True,
-			)
+            with col2:
+                prix_moyen = stats["prix_moyen"] or 0
+                st.markdown(
+					f"""
+					<div style='background: linear-gradient(135deg, #2563eb 0%, #3b82f6 100%);
+								padding: 1.5rem; border-radius: 12px; text-align: center;
+								box-shadow: 0 4px 12px rgba(37, 99, 235, 0.4);'>
+						<div style='font-size: 2.5rem; font-weight: 700; color: white;'>{prix_moyen/1e6:.2f}M€</div>
+						<div style='color: #dbeafe; font-size: 0.9rem; margin-top: 0.3rem;'>Prix moyen</div>
+					</div>
+					""",
+					unsafe_allow_html=True,
+				)
 
-        with col3:
-            prix_m2_med = df_resultats["prix_m2"].median()
-            st.markdown(
-				f"""
-				<div style='background: linear-gradient(135deg, #06b6d4 0%, #0891b2 100%);
-							padding: 1.5rem; border-radius: 12px; text-align: center;
-							box-shadow: 0 4px 12px rgba(6, 182, 212, 0.4);'>
-					<div style='font-size: 2.5rem; font-weight: 700; color: white;'>{prix_m2_med:,.0f}€</div>
-					<div style='color: #cffafe; font-size: 0.9rem; margin-top: 0.3rem;'>Prix/m² médian</div>
-				</div>
-				""",
-				unsafe_allow_html=True,
-			)
+            with col3:
+                prix_m2_med = stats["prix_m2_median"] or 0
+                st.markdown(
+					f"""
+					<div style='background: linear-gradient(135deg, #06b6d4 0%, #0891b2 100%);
+								padding: 1.5rem; border-radius: 12px; text-align: center;
+								box-shadow: 0 4px 12px rgba(6, 182, 212, 0.4);'>
+						<div style='font-size: 2.5rem; font-weight: 700; color: white;'>{prix_m2_med:,.0f}€</div>
+						<div style='color: #cffafe; font-size: 0.9rem; margin-top: 0.3rem;'>Prix/m² médian</div>
+					</div>
+					""",
+					unsafe_allow_html=True,
+				)
 
-        with col4:
-            surface_moy = df_resultats["surface_reelle_bati"].mean()
-            st.markdown(
-				f"""
-				<div style='background: linear-gradient(135deg, #0284c7 0%, #0369a1 100%);
-							padding: 1.5rem; border-radius: 12px; text-align: center;
-							box-shadow: 0 4px 12px rgba(2, 132, 199, 0.4);'>
-					<div style='font-size: 2.5rem; font-weight: 700; color: white;'>{surface_moy:.0f}m²</div>
-					<div style='color: #bae6fd; font-size: 0.9rem; margin-top: 0.3rem;'>Surface moyenne</div>
-				</div>
-				""",
-				unsafe_allow_html=True,
-			)
+            with col4:
+                surface_moy = stats["surface_moyenne"] or 0
+                st.markdown(
+					f"""
+					<div style='background: linear-gradient(135deg, #0284c7 0%, #0369a1 100%);
+								padding: 1.5rem; border-radius: 12px; text-align: center;
+								box-shadow: 0 4px 12px rgba(2, 132, 199, 0.4);'>
+						<div style='font-size: 2.5rem; font-weight: 700; color: white;'>{surface_moy:.0f}m²</div>
+						<div style='color: #bae6fd; font-size: 0.9rem; margin-top: 0.3rem;'>Surface moyenne</div>
+					</div>
+					""",
+					unsafe_allow_html=True,
+				)
+        else:
+            st.info("Statistiques indisponibles pour le moment.")
 
         st.markdown("<br>", unsafe_allow_html=True)
 
         tab1, tab2, tab3 = st.tabs(["Liste des résultats", "Graphiques", "Carte"])
 
         with tab1:
-            st.subheader(f"{len(resultats)} transactions trouvées")
-
-            for _, row in df_resultats.head(20).iterrows():
-                with st.container():
-                    col_info, col_prix = st.columns([3, 1])
-                    with col_info:
-                        arr = row.get("arrondissement", "?")
-                        date_val = row.get("date_mutation", "")
-                        date_txt = date_val.strftime("%d/%m/%Y") if pd.notna(date_val) else "N/A"
-                        st.markdown(
-							f"""
-							<div style='background: linear-gradient(135deg, #0f2f4f 0%, #1a3a52 100%);
-										padding: 1rem; border-radius: 10px; margin-bottom: 0.8rem;
-										border-left: 4px solid #0ea5e9;
-										box-shadow: 0 2px 8px rgba(14, 165, 233, 0.2);'>
-								<div style='color: #0ea5e9; font-weight: 600; font-size: 1.1rem;'>
-									{row.get("type_local", "N/A")} - Paris {arr}ème
+            if resultats is not None:
+                st.subheader(f"{total_txt} transactions trouvées")
+
+                if st.button("Préparer l'export de tous les résultats (CSV)"):
+                    if surveillance_es.circuit_ouvert():
+                        st.error("Elasticsearch est indisponible, export impossible pour le moment.")
+                    else:
+                        try:
+                            with st.spinner("Export en cours..."):
+                                donnees_csv = exporter_csv(query or "", filtres=filtres)
+                        except Exception as e:
+                            st.error(f"L'export a échoué: {e}")
+                        else:
+                            st.download_button(
+								"Télécharger le CSV",
+								data=donnees_csv,
+								file_name="transactions_dvf.csv",
+								mime="text/csv",
+							)
+
+                for _, row in df_resultats.head(20).iterrows():
+                    with st.container():
+                        col_info, col_prix = st.columns([3, 1])
+                        with col_info:
+                            arr = row.get("arrondissement", "?")
+                            date_val = row.get("date_mutation", "")
+                            date_txt = date_val.strftime("%d/%m/%Y") if pd.notna(date_val) else "N/A"
+                            st.markdown(
+								f"""
+								<div style='background: linear-gradient(135deg, #0f2f4f 0%, #1a3a52 100%);
+											padding: 1rem; border-radius: 10px; margin-bottom: 0.8rem;
+											border-left: 4px solid #0ea5e9;
+											box-shadow: 0 2px 8px rgba(14, 165, 233, 0.2);'>
+									<div style='color: #0ea5e9; font-weight: 600; font-size: 1.1rem;'>
+										{row.get("type_local", "N/A")} - Paris {arr}ème
+									</div>
+									<div style='color: #94a3b8; font-size: 0.85rem; margin-top: 0.3rem;'>
+										Date: {date_txt}
+										&nbsp;&nbsp;|&nbsp;&nbsp;
+										Surface: {row.get("surface_reelle_bati", 0):.0f} m²
+										&nbsp;&nbsp;|&nbsp;&nbsp;
+										Vente: {row.get("nature_mutation", "Vente")}
+									</div>
 								</div>
-								<div style='color: #94a3b8; font-size: 0.85rem; margin-top: 0.3rem;'>
-									Date: {date_txt}
-									&nbsp;&nbsp;|&nbsp;&nbsp;
-									Surface: {row.get("surface_reelle_bati", 0):.0f} m²
-									&nbsp;&nbsp;|&nbsp;&nbsp;
-									Vente: {row.get("nature_mutation", "Vente")}
+								""",
+								unsafe_allow_html=True,
+							)
+
+                        with col_prix:
+                            prix = row.get("valeur_fonciere", 0)
+                            prix_m2 = row.get("prix_m2", 0)
+                            st.markdown(
+								f"""
+								<div style='background: linear-gradient(135deg, #0ea5e9 0%, #06b6d4 100%);
+											padding: 1rem; border-radius: 10px; text-align: center;
+											box-shadow: 0 2px 8px rgba(14, 165, 233, 0.3);'>
+									<div style='font-size: 1.8rem; font-weight: 700; color: white;'>
+										{prix/1e6:.2f}M€
+									</div>
+									<div style='color: #e0f2fe; font-size: 0.8rem;'>
+										{prix_m2:,.0f}€/m²
+									</div>
 								</div>
-							</div>
-							""",
-							unsafe_allow_html=True,
-						)
-
-                    with col_prix:
-                        prix = row.get("valeur_fonciere", 0)
-                        prix_m2 = row.get("prix_m2", 0)
-                        st.markdown(
-							f"""
-							<div style='background: linear-gradient(135deg, #0ea5e9 0%, #06b6d4 100%);
-										padding: 1rem; border-radius: 10px; text-align: center;
-										box-shadow: 0 2px 8px rgba(14, 165, 233, 0.3);'>
-								<div style='font-size: 1.8rem; font-weight: 700; color: white;'>
-									{prix/1e6:.2f}M€
-								</div>
-								<div style='color: #e0f2fe; font-size: 0.8rem;'>
-									{prix_m2:,.0f}€/m²
-								</div>
-							</div>
-							""",
-							unsafe_allow_html=True,
-						)
+								""",
+								unsafe_allow_html=True,
+							)
 
-            if len(df_resultats) > 20:
-                st.info(f"Affichage de 20 résultats sur {len(df_resultats)} trouvés")
+                if len(df_resultats) > 20:
+                    st.info(f"Affichage de 20 résultats sur {total_txt} trouvés")
+            else:
+                st.warning("Liste des résultats indisponible pour le moment.")
 
         with tab2:
-            col_g1, col_g2 = st.columns(2)
-            with col_g1:
-                agg_arr = df_resultats.groupby("arrondissement").agg({
-					"valeur_fonciere": ["mean", "count"]
-				}).reset_index()
-                agg_arr.columns = ["arrondissement", "prix_moyen", "count"]
-
-                fig = px.bar(
-					agg_arr,
-					x="arrondissement",
-					y="count",
-					color="prix_moyen",
-					title="Résultats par arrondissement",
-					labels={"arrondissement": "Arrondissement", "count": "Nombre", "prix_moyen": "Prix moyen"},
-					color_continuous_scale="Blues",
-				)
-            fig.update_traces(marker_line_width=0)
-            styliser_fig(fig)
-            st.plotly_chart(fig, use_container_width=True)
-
-            with col_g2:
-                fig = px.histogram(
-					df_resultats,
-					x="valeur_fonciere",
-					nbins=30,
-					title="Distribution des prix",
-					labels={"valeur_fonciere": "Prix (€)"},
-				)
-                fig.update_traces(marker_color=SECONDARY_COLOR)
+            if stats is not None:
+                col_g1, col_g2 = st.columns(2)
+                with col_g1:
+                    fig = px.bar(
+						stats["par_arrondissement"],
+						x="arrondissement",
+						y="count",
+						color="prix_moyen",
+						title="Résultats par arrondissement",
+						labels={"arrondissement": "Arrondissement", "count": "Nombre", "prix_moyen": "Prix moyen"},
+						color_continuous_scale="Blues",
+					)
+                fig.update_traces(marker_line_width=0)
                 styliser_fig(fig)
                 st.plotly_chart(fig, use_container_width=True)
 
-            if "type_local" in df_resultats.columns:
-                agg_type = df_resultats.groupby("type_local").agg({
-					"prix_m2": "median",
-					"valeur_fonciere": "count"
-				}).reset_index()
-                agg_type.columns = ["type_local", "prix_m2_median", "count"]
-
-                fig = px.bar(
-					agg_type,
-					x="type_local",
-					y="prix_m2_median",
-					color="count",
-					title="Prix médian/m² par type de bien",
-					labels={"type_local": "Type", "prix_m2_median": "Prix/m² médian", "count": "Nombre"},
-					text="count",
-					color_continuous_scale="Turbo",
-				)
-                fig.update_traces(textposition="outside", marker_line_width=0)
-                styliser_fig(fig)
-                st.plotly_chart(fig, use_container_width=True)
+                with col_g2:
+                    histo = stats["histogramme_prix"]
+                    fig = px.bar(
+						histo,
+						x="centre",
+						y="count",
+						title="Distribution des prix",
+						labels={"centre": "Prix (€)", "count": "Nombre"},
+					)
+                    fig.update_layout(bargap=0)
+                    fig.update_traces(marker_color=SECONDARY_COLOR)
+                    styliser_fig(fig)
+                    st.plotly_chart(fig, use_container_width=True)
+
+                if not stats["par_type"].empty:
+                    fig = px.bar(
+						stats["par_type"],
+						x="type_local",
+						y="prix_m2_median",
+						color="count",
+						title="Prix médian/m² par type de bien",
+						labels={"type_local": "Type", "prix_m2_median": "Prix/m² médian", "count": "Nombre"},
+						text="count",
+						color_continuous_scale="Turbo",
+					)
+                    fig.update_traces(textposition="outside", marker_line_width=0)
+                    styliser_fig(fig)
+                    st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.warning("Graphiques indisponibles pour le moment.")
 
         with tab3:
             if "latitude" in df_resultats.columns and "longitude" in df_resultats.columns:
@@ -282,35 +347,26 @@ def render_recherche(_df):
                 styliser_fig(fig)
                 st.plotly_chart(fig, use_container_width=True)
 
-                st.markdown("### Statistiques géographiques")
-                col_s1, col_s2, col_s3 = st.columns(3)
-                with col_s1:
-                    arr_counts = df_geo["arrondissement"].value_counts().head(3)
-                    st.markdown("**Top 3 arrondissements:**")
-                    for arr, count in arr_counts.items():
-                        st.write(f"  • {arr}ème: {count} transactions")
-
-                with col_s2:
-                    prix_moyen_geo = (
-						df_geo.groupby("arrondissement")["prix_m2"]
-						.median()
-						.sort_values(ascending=False)
-						.head(3)
-					)
-                    st.markdown("**Prix/m² les plus élevés:**")
-                    for arr, prix in prix_moyen_geo.items():
-                        st.write(f"  • {arr}ème: {prix:,.0f}€/m²")
-
-                with col_s3:
-                    surface_arr = (
-						df_geo.groupby("arrondissement")["surface_reelle_bati"]
-						.mean()
-						.sort_values(ascending=False)
-						.head(3)
-					)
-                    st.markdown("**Surfaces moyennes:**")
-                    for arr, surf in surface_arr.items():
-                        st.write(f"  • {arr}ème: {surf:.0f}m²")
+                if stats is not None:
+                    st.markdown("### Statistiques géographiques")
+                    col_s1, col_s2, col_s3 = st.columns(3)
+                    with col_s1:
+                        arr_counts = stats["par_arrondissement"].nlargest(3, "count")
+                        st.markdown("**Top 3 arrondissements:**")
+                        for arr, count in zip(arr_counts["arrondissement"], arr_counts["count"]):
+                            st.write(f"  • {arr}ème: {count} transactions")
+
+                    with col_s2:
+                        prix_moyen_geo = stats["par_arrondissement"].dropna(subset=["prix_m2_median"]).nlargest(3, "prix_m2_median")
+                        st.markdown("**Prix/m² les plus élevés:**")
+                        for arr, prix in zip(prix_moyen_geo["arrondissement"], prix_moyen_geo["prix_m2_median"]):
+                            st.write(f"  • {arr}ème: {prix:,.0f}€/m²")
+
+                    with col_s3:
+                        surface_arr = stats["par_arrondissement"].dropna(subset=["surface_moyenne"]).nlargest(3, "surface_moyenne")
+                        st.markdown("**Surfaces moyennes:**")
+                        for arr, surf in zip(surface_arr["arrondissement"], surface_arr["surface_moyenne"]):
+                            st.write(f"  • {arr}ème: {surf:.0f}m²")
 
     if not query:
         st.markdown("---")
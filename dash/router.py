@@ -40,11 +40,15 @@ def render_app():
         }
         choix = navbar.navbar(pages, icons=icons)
 
+    # la page Recherche recouvre le chargement des donnees avec sa requete Elasticsearch
+    if choix == "Recherche":
+        recherche.render_recherche(layout.charger_donnees)
+        return
+
     # chargement des donnees
     df = layout.charger_donnees()
     if df.empty:
-        st.warning("aucune donnée disponible. lancez le scraper ou vérifiez la base.")
-        st.info("commandes utiles: docker-compose up -d puis python etl/scraper.py")
+        layout.afficher_donnees_absentes()
         return
 
     # routage vers les pages (chaque page gere ses propres filtres)
@@ -56,7 +60,5 @@ def render_app():
         home.render_prix(df)
     elif choix == "Carte":
         carte.render_carte(df)
-    elif choix == "Recherche":
-        recherche.render_recherche(df)
     elif choix == "À propos":
         about.render_about()